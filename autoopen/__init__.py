@@ -17,8 +17,9 @@ to stdout.
 
 ## Advanced Usage
 
-autoopen will look up the last suffix of the given filename in the `open_handlers` dictionary.
-Each entry of that dictionary maps to a list of OpenHandler objects. autoopen takes the first
+autoopen will look up the suffix of the given filename in the read-only `open_handlers` mapping. Suffixes may
+contain more than one dot, like `.tar.zst`, the longest registered suffix wins.
+Each entry of that mapping maps to a tuple of OpenHandler objects, use `OpenHandler.register()` to add one. autoopen takes the first
 handler that says it is supported (i.e., the corresponding compressor module can be imported)
 and calls it with its own arguments, returning the results.
 
@@ -27,42 +28,169 @@ Use `find_handler(filename)` to find the appropriate handler manually.
 
 
 """
+import io
 import os
 import sys
-from collections import defaultdict
+import threading
 from contextlib import nullcontext
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import wraps
 from importlib import import_module
-from lzma import FORMAT_ALONE
+from importlib.util import find_spec
 from os import PathLike
-from pathlib import Path
-from typing import List, Optional, Callable
-
-__all__ = ["autoopen"]
-
-open_handlers: dict[str, list["OpenHandler"]] = defaultdict(list)
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Callable
+
+__all__ = [
+    "autoopen",
+    "autoopener",
+    "autoopen_gz_rt",
+    "autoopen_gz_rb",
+    "autoopen_bz2_rb",
+    "autoopen_xz_rb",
+    "use_external_decompressors",
+]
+
+COMPRESSED_BUFFER_SIZE = 256 * 1024
+"""Default size of the buffer between a (de)compressor and the caller."""
+
+_registry: dict[Optional[str], list["OpenHandler"]] = {}
+open_handlers: Mapping[Optional[str], tuple["OpenHandler", ...]] = MappingProxyType({})
+"""Read-only snapshot of the registered handlers, rebuilt by each registration."""
+_suffix_depth = 1  # maximum number of dots in a registered suffix, like 2 for .tar.zst
+_registry_version = 0  # incremented on each registration, to invalidate caches
+_import_lock = threading.Lock()  # guards resolving OpenHandler.open_function
+_registry_lock = threading.Lock()  # guards changes to _registry and open_handlers
+
+# handlers use __slots__ where dataclasses support it (Python 3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
 class NoCompressorError(IOError):
     ...
 
 
+def _freeze_registry():
+    """
+    Replaces open_handlers with a read-only snapshot of the registry.
+    """
+    global open_handlers
+    open_handlers = MappingProxyType(
+        {suffix: tuple(handlers) for suffix, handlers in _registry.items()}
+    )
+
+
+def _register_many(handlers, first=False):
+    """
+    Registers the given handlers in order, after (or, if first is true, before) the existing handlers.
+
+    A handler that is already registered for a suffix is not added again, but registering it first moves it to the
+    front.
+    """
+    with _registry_lock:
+        _register_many_locked(handlers, first)
+
+
+def _register_many_locked(handlers, first):
+    global _suffix_depth, _registry_version
+    registry = _registry
+    suffix_depth = _suffix_depth
+    inserted = {}  # suffix -> number of handlers inserted in front
+    for handler in handlers:
+        for suffix in handler.suffixes:
+            if suffix is not None:
+                suffix = suffix.lower()  # find_handler matches case-insensitively
+            registered = registry.setdefault(suffix, [])
+            present = any(other is handler for other in registered)
+            if present and not first:
+                continue
+            if suffix is not None and suffix.startswith("."):
+                suffix_depth = max(suffix_depth, suffix.count("."))
+            if first:
+                if present:
+                    registered[:] = [
+                        other for other in registered if other is not handler
+                    ]
+                position = inserted.get(suffix, 0)
+                registered.insert(position, handler)
+                inserted[suffix] = position + 1
+            else:
+                registered.append(handler)
+    _suffix_depth = suffix_depth
+    _registry_version += 1
+    _freeze_registry()
+
+
+def _partition_handlers(suffix):
+    """
+    Moves the supported handlers for suffix to the front, keeping their order otherwise, and returns them.
+    """
+    for handler in open_handlers[
+        suffix
+    ]:  # probe outside the lock, the results are cached
+        handler.is_supported()
+    with _registry_lock:
+        current = _registry[suffix]
+        ordered = sorted(current, key=lambda handler: not handler.is_supported())
+        if any(new is not old for new, old in zip(ordered, current)):
+            _registry[suffix] = ordered
+            _freeze_registry()
+        return open_handlers[suffix]
+
+
+def _find_executable(name) -> Optional[str]:
+    """
+    Like shutil.which(), which we avoid since importing shutil imports bz2 and lzma.
+    """
+    extensions = [""]
+    if sys.platform == "win32":
+        extensions += os.environ.get("PATHEXT", "").split(os.pathsep)
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        for extension in extensions:
+            path = os.path.join(directory, name + extension)
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
+    return None
+
+
+def _suffix(name, depth=1) -> Optional[str]:
+    """
+    Returns the lowercased suffix of name that spans depth dots, or None if there is none. A leading dot is no suffix.
+    """
+    start = max(name.rfind("/"), name.rfind(os.sep)) + 2
+    dot = len(name)
+    for _ in range(depth):
+        dot = name.rfind(".", start, dot)
+        if dot < 0:
+            return None
+    return name[dot:].lower()
+
+
 def find_handler(filename, checked=True):
-    if filename == "-":
-        candidates = open_handlers["-"]
+    name = os.fspath(filename)
+    if name == "-":
+        key = "-"
+        candidates = open_handlers.get("-")
     else:
-        path = Path(filename)
-        last_suffix = path.suffixes[-1] if path.suffixes else None
-        candidates = open_handlers[last_suffix]
+        # Try the suffixes from the shortest to the longest registered one, the longest match wins.
+        key = candidates = None
+        for depth in range(1, _suffix_depth + 1):
+            suffix = _suffix(name, depth)
+            if suffix is None:
+                break
+            if open_handlers.get(suffix):
+                key, candidates = suffix, open_handlers[suffix]
     if candidates:
-        for candidate in candidates:
-            if candidate.is_supported():
-                return candidate
+        if not candidates[0].is_supported():
+            candidates = _partition_handlers(key)
+        if candidates[0].is_supported():
+            return candidates[0]
         if checked:  # candidates, but none works
             raise NoCompressorError(
                 f"The file {filename} is compressed, but no matching compressor is available. Failed to import:\n"
-                + "\n".join(f" - {c.module} for {c.description}" for c in candidates)
+                + "\n".join(
+                    f" - {c.requirement} for {c.description}" for c in candidates
+                )
             )
         else:
             return None
@@ -70,26 +198,147 @@ def find_handler(filename, checked=True):
         return open_handlers[None][0]  # handler using default open function
 
 
-def autoopen(file, mode="rt", encoding=None, errors=None, newline=None):
+def autoopen(
+    file,
+    mode="rt",
+    encoding=None,
+    errors=None,
+    newline=None,
+    buffer_size=COMPRESSED_BUFFER_SIZE,
+):
     """
     Opens a file, transparently (de-)compressing it by filename.
 
-    This function checks the given file name's last suffix whether it belongs to a known single-file compression format.
-    GIf so, it tries to use that compression library to open the file and returns the result. Otherwise, it simply calls
+    This function checks the given file name's suffix whether it belongs to a known single-file compression format.
+    If so, it tries to use that compression library to open the file and returns the result. Otherwise, it simply calls
     `open()`.
 
-    If file is the special string `-`, it will return stdin or stdout, depending on the mode.
+    Compressed streams are wrapped in a buffer of `buffer_size` bytes, which is much larger than the compressors'
+    defaults and considerably speeds up reading and writing in small pieces, e.g. line by line.
+
+    If file is the special string `-`, it will return stdin or stdout, depending on the mode. If file is stdin or
+    stdout itself, it is returned as is (or its binary buffer, for binary modes), a ValueError is raised if the mode
+    does not fit.
     """
-    handler = find_handler(file)
+    if (
+        file == "-" and open_handlers["-"][0] is _stdinout
+    ):  # fast path, unless replaced by a custom handler
+        return _std_context(sys.stdin if "r" in mode else sys.stdout, mode)
+    if file is sys.stdin or file is sys.stdout:
+        if ("r" in mode) != (file is sys.stdin):
+            raise ValueError(
+                f"Cannot open {'stdin' if file is sys.stdin else 'stdout'} with mode {mode!r}"
+            )
+        return _std_context(file, mode)
+    path = os.fspath(file)
+    handler = open_handlers["-"][0] if path == "-" else find_handler(path)
     return handler(
-        os.fspath(file), mode=mode, encoding=encoding, errors=errors, newline=newline
+        path,
+        mode=mode,
+        encoding=encoding,
+        errors=errors,
+        newline=newline,
+        buffer_size=buffer_size,
     )
 
 
+def autoopener(
+    mode="rt",
+    encoding=None,
+    errors=None,
+    newline=None,
+    buffer_size=COMPRESSED_BUFFER_SIZE,
+):
+    """
+    Returns a function that opens a file like `autoopen` with the given arguments.
+
+    The function remembers the handlers for the suffixes it has seen, which makes opening many files faster:
+
+    ```
+    open_text = autoopener("rt", encoding="utf-8")
+    for filename in filenames:
+        with open_text(filename) as f:
+            ...
+    ```
+    """
+    handlers = {}  # last suffix -> handler
+    version = _registry_version
+
+    def opener(file):
+        nonlocal version
+        if file is sys.stdin or file is sys.stdout:
+            return autoopen(file, mode)
+        name = os.fspath(file)
+        if name == "-" or _suffix_depth > 1:
+            handler = find_handler(name)
+        else:
+            if version != _registry_version:
+                handlers.clear()
+                version = _registry_version
+            last_suffix = _suffix(name)
+            handler = handlers.get(last_suffix)
+            if handler is None:
+                handler = handlers[last_suffix] = find_handler(name)
+        return handler(
+            name,
+            mode=mode,
+            encoding=encoding,
+            errors=errors,
+            newline=newline,
+            buffer_size=buffer_size,
+        )
+
+    return opener
+
+
+# Specialized functions for the most common cases. They skip the handler lookup, and thus ignore registered handlers.
+
+
+def autoopen_gz_rt(
+    path, encoding=None, errors=None, newline=None, buffer_size=COMPRESSED_BUFFER_SIZE
+):
+    """
+    Opens a gzip compressed file for reading text, like `autoopen(path, "rt")`, but in-process.
+    """
+    import gzip
+
+    return _wrap_stream(
+        gzip.open(path, "rb"), "rt", buffer_size, encoding, errors, newline
+    )
+
+
+def autoopen_gz_rb(path, buffer_size=COMPRESSED_BUFFER_SIZE):
+    """
+    Opens a gzip compressed file for reading bytes, like `autoopen(path, "rb")`, but in-process.
+    """
+    import gzip
+
+    return _wrap_stream(gzip.open(path, "rb"), "rb", buffer_size)
+
+
+def autoopen_bz2_rb(path, buffer_size=COMPRESSED_BUFFER_SIZE):
+    """
+    Opens a bzip2 compressed file for reading bytes, like `autoopen(path, "rb")`, but in-process.
+    """
+    import bz2
+
+    return _wrap_stream(bz2.open(path, "rb"), "rb", buffer_size)
+
+
+def autoopen_xz_rb(path, buffer_size=COMPRESSED_BUFFER_SIZE):
+    """
+    Opens an xz compressed file for reading bytes, like `autoopen(path, "rb")`, but in-process.
+    """
+    import lzma
+
+    return _wrap_stream(lzma.open(path, "rb"), "rb", buffer_size)
+
+
 def openhandler(
     *extensions: List[str],
     description: Optional[str] = None,
     module: Optional[str] = None,
+    buffered: bool = False,
 ):
     """
     Decorator that registers a function as an open function for the given extensions.
@@ -98,6 +347,7 @@ def openhandler(
         *extensions:
         description:
         module:
+        buffered: see `OpenHandler`
 
     Returns:
 
@@ -105,7 +355,11 @@ def openhandler(
 
     def create_handler(f):
         handler = OpenHandler(
-            extensions, description=description, module=module, open_function=f
+            extensions,
+            description=description,
+            module=module,
+            open_function=f,
+            buffered=buffered,
         )
         handler.register()
         return handler
@@ -113,7 +367,7 @@ def openhandler(
     return create_handler
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class OpenHandler:
     """
     Base implementation of an registerable open handler.
@@ -123,16 +377,29 @@ class OpenHandler:
         description: A human-readable description
         module: Optional name of a module that is required for the handler to work
         open_function: An implementation of open that works like builtins.open()
+        buffered: If true, open_function is only called with a binary mode and without further arguments.
+            The stream it returns is then wrapped in a buffer and, for text modes, in a TextIOWrapper.
     """
 
     suffixes: List[str]
     description: Optional[str] = None
     module: Optional[str] = None
     open_function: Optional[Callable] = None
+    buffered: bool = False
+    _supported: Optional[bool] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def register(self, first=False):
+        """
+        Registers this handler for its suffixes, after (or, if first is true, before) the existing handlers.
+        """
+        _register_many((self,), first)
 
-    def register(self):
-        for suffix in self.suffixes:
-            open_handlers[suffix].append(self)
+    @property
+    def requirement(self) -> Optional[str]:
+        """What must be available for this handler to work."""
+        return self.module
 
     def load_module(self):
         if self.module is not None:
@@ -141,52 +408,295 @@ class OpenHandler:
             return None
 
     def is_supported(self) -> bool:
-        if self.module is None:
-            return True
-        else:
-            try:
-                self.load_module()
-                return True
-            except ImportError:
-                return False
-
-    def __call__(self, file, mode="rt", encoding=None, errors=None, newline=None):
-        if self.open_function is None:
-            if self.module is not None:
-                module = self.load_module()
-                self.open_function = module.open
+        """
+        Checks whether the required module is available, without actually importing it.
+
+        The result is cached, the module is only imported when the handler is called.
+        """
+        if self._supported is None:
+            if self.module is None:
+                self._supported = True
             else:
-                raise NotImplementedError(
-                    f"Neither open implementation nor module with open function provided. This is a bug."
-                )
-        return self.open_function(
+                try:
+                    spec = find_spec(self.module)
+                except (ImportError, ValueError):  # e.g., missing parent package
+                    spec = None
+                # namespace packages have no loader, and no open function
+                self._supported = spec is not None and spec.loader is not None
+        return self._supported
+
+    def __call__(
+        self,
+        file,
+        mode="rt",
+        encoding=None,
+        errors=None,
+        newline=None,
+        buffer_size=COMPRESSED_BUFFER_SIZE,
+    ):
+        open_function = self.open_function
+        if open_function is None:
+            open_function = self._resolve_open_function()
+        if self.buffered:
+            binary_mode = mode.replace("t", "")
+            if "b" not in binary_mode:
+                binary_mode += "b"
+            stream = open_function(file, binary_mode)
+            return _wrap_stream(stream, mode, buffer_size, encoding, errors, newline)
+        if "b" in mode:  # text arguments would be useless
+            return open_function(file, mode=mode)
+        return open_function(
             file, mode=mode, encoding=encoding, errors=errors, newline=newline
         )
 
+    def _resolve_open_function(self) -> Callable:
+        """
+        Imports the module and stores its open function as this handler's open_function.
+        """
+        with _import_lock:
+            if self.open_function is None:
+                if self.module is None:
+                    raise NotImplementedError(
+                        f"Neither open implementation nor module with open function provided. This is a bug."
+                    )
+                open_function = getattr(self.load_module(), "open", None)
+                if open_function is None:
+                    raise NotImplementedError(
+                        f"Module {self.module} has no open function, {self.description} needs a custom open handler."
+                    )
+                self.open_function = open_function
+            return self.open_function
+
+
+@dataclass(**_SLOTS)
+class SubprocessOpenHandler(OpenHandler):
+    """
+    Open handler that reads files by piping them through an external decompressor, like `gzip -dc`.
+
+    Decompression then runs in a separate process, in parallel to the consumer. The resulting streams are not
+    seekable. Other modes than reading are delegated to the fallback handler.
+
+    Attributes:
+        command: The decompressor's command line. It must read from stdin and write to stdout.
+        fallback: Handler to use for writing
+    """
+
+    command: List[str] = field(default_factory=list)
+    fallback: Optional[OpenHandler] = None
+    buffered: bool = True
+
+    @property
+    def requirement(self) -> Optional[str]:
+        return self.command[0]
+
+    def is_supported(self) -> bool:
+        if self._supported is None:
+            self._supported = _find_executable(self.command[0]) is not None
+        return self._supported
+
+    def __call__(
+        self,
+        file,
+        mode="rt",
+        encoding=None,
+        errors=None,
+        newline=None,
+        buffer_size=COMPRESSED_BUFFER_SIZE,
+    ):
+        if "r" not in mode:
+            if self.fallback is None or not self.fallback.is_supported():
+                raise NoCompressorError(
+                    f"{self.description} files can only be read, not written, using {self.requirement}"
+                )
+            return self.fallback(file, mode, encoding, errors, newline, buffer_size)
+        stream = _ProcessReader(self.command, file)
+        return _wrap_stream(stream, mode, buffer_size, encoding, errors, newline)
+
+
+class _ProcessReader(io.RawIOBase):
+    """
+    Raw stream reading the output of a filter process that gets the given file as input.
+
+    Closing the stream ends the process. If it has been read to the end, an unsuccessful exit raises an OSError
+    with the process' error output.
+    """
+
+    def __init__(self, command, filename):
+        self.name = filename
+        self._command = command
+        self._eof = False
+        import subprocess
+
+        with open(filename, "rb") as input:
+            self._process = subprocess.Popen(
+                command,
+                stdin=input,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,  # readinto returns what is available, instead of waiting for a full buffer
+            )
 
-# Now, let's define and register some default handlers. These are from the standard library:
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._process.stdout.readinto(buffer)
+        if not count:
+            self._eof = True
+        return count
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        if not self._eof:
+            self._process.kill()
+        self._process.stdout.close()
+        _, error_output = self._process.communicate()
+        if self._eof and self._process.returncode != 0:
+            raise OSError(
+                f"{' '.join(self._command)} failed with exit status {self._process.returncode} for {self.name}: "
+                + error_output.decode(errors="replace").strip()
+            )
+
+
+def _wrap_stream(stream, mode, buffer_size, encoding=None, errors=None, newline=None):
+    """
+    Wraps a binary stream in a buffer of buffer_size bytes and, unless mode is binary, in a TextIOWrapper.
+    """
+    if buffer_size:
+        if "r" in mode:
+            stream = io.BufferedReader(stream, buffer_size)
+        else:
+            stream = io.BufferedWriter(stream, buffer_size)
+    if "b" in mode:
+        return stream
+    return io.TextIOWrapper(stream, encoding, errors, newline)
 
-OpenHandler([".gz"], description="GZip", module="gzip").register()
-OpenHandler([".bz2"], description="BZip2", module="bz2").register()
-OpenHandler([".xz"], description="LZMA files (.xz format)", module="lzma").register()
-OpenHandler([None], description="uncompressed files", open_function=open).register()
 
+# Now, let's define and register some default handlers. Some need their own open functions:
 
-@openhandler(".lzma", description="LZMA files (deprecated .lzma format", module="lzma")
-def open_xz(filename, mode="rt", **kwargs):
+
+def open_xz(filename, mode="rb", **kwargs):
     import lzma
 
-    return lzma.open(filename, mode, format=FORMAT_ALONE, **kwargs)
+    return lzma.open(filename, mode, format=lzma.FORMAT_ALONE, **kwargs)
 
 
-# Here is our special stdin/out handler. TODO text/binary handling?
-@openhandler("-", description="Use - to use stdin/stdout")
+# Here is our special stdin/out handler.
 def open_stdinout(filename, mode="rt", **kwargs):
+    return _std_context(sys.stdin if "r" in mode else sys.stdout, mode)
+
+
+_std_contexts = (
+    {}
+)  # stream -> nullcontext(stream), reused since sys.stdin and sys.stdout rarely change
+
+
+def _std_context(stream, mode):
+    """
+    Returns a context for stream (or its binary buffer, for binary modes) that does not close it on exit.
+    """
+    if "b" in mode:
+        try:
+            stream = stream.buffer
+        except AttributeError:
+            raise ValueError(
+                f"{stream!r} is a text-only stream, it cannot be opened with mode {mode!r}"
+            ) from None
+    context = _std_contexts.get(stream)
+    if context is None:
+        if (
+            len(_std_contexts) >= 8
+        ):  # the streams have been replaced, e.g. by redirect_stdout
+            _std_contexts.clear()
+        context = _std_contexts[stream] = nullcontext(stream)
+    return context
+
+
+def open_zstd(filename, mode="rb", **kwargs):
+    import zstandard
+
+    # A (de)compression context can only serve one open stream at a time, so each call gets its own.
+    file = open(filename, mode)
     if "r" in mode:
-        return nullcontext(sys.stdin)
+        return zstandard.ZstdDecompressor().stream_reader(
+            file,
+            read_size=COMPRESSED_BUFFER_SIZE,
+            read_across_frames=True,
+            closefd=True,
+        )
     else:
-        return nullcontext(sys.stdout)
+        return zstandard.ZstdCompressor().stream_writer(
+            file, write_return_read=True, closefd=True
+        )
 
 
+# These are from the standard library:
+_gzip = OpenHandler([".gz"], description="GZip", module="gzip", buffered=True)
+_bzip2 = OpenHandler([".bz2"], description="BZip2", module="bz2", buffered=True)
+_xz = OpenHandler(
+    [".xz"], description="LZMA files (.xz format)", module="lzma", buffered=True
+)
 # The zstandard handler will only work if the corresponding library is present.
-OpenHandler([".zst", ".zstd"], description="ZStandard", module="zstandard").register()
+_zstd = OpenHandler(
+    [".zst", ".zstd"],
+    description="ZStandard",
+    module="zstandard",
+    open_function=open_zstd,
+    buffered=True,
+)
+
+_stdinout = OpenHandler(
+    ["-"], description="Use - to use stdin/stdout", open_function=open_stdinout
+)
+
+_DEFAULTS = (
+    _gzip,
+    _bzip2,
+    _xz,
+    OpenHandler(
+        [".lzma"],
+        description="LZMA files (deprecated .lzma format)",
+        module="lzma",
+        open_function=open_xz,
+        buffered=True,
+    ),
+    _zstd,
+    _stdinout,
+    OpenHandler([None], description="uncompressed files", open_function=open),
+)
+_register_many(_DEFAULTS)
+
+# Handlers that decompress in a separate process, see use_external_decompressors(). Writing is delegated to the
+# in-process handlers.
+EXTERNAL_DECOMPRESSORS = (
+    SubprocessOpenHandler(
+        [".gz"], description="GZip", command=["gzip", "-dc"], fallback=_gzip
+    ),
+    SubprocessOpenHandler(
+        [".bz2"], description="BZip2", command=["bzip2", "-dc"], fallback=_bzip2
+    ),
+    SubprocessOpenHandler(
+        [".xz"],
+        description="LZMA files (.xz format)",
+        command=["xz", "-dc", "-T0"],
+        fallback=_xz,
+    ),
+    SubprocessOpenHandler(
+        [".zst", ".zstd"],
+        description="ZStandard",
+        command=["zstd", "-dc"],
+        fallback=_zstd,
+    ),
+)
+
+
+def use_external_decompressors():
+    """
+    Prefers the command line tools gzip, bzip2, xz, and zstd for reading, where they are available.
+
+    Decompression then runs in a separate process, in parallel to the consumer. This pays off for large files,
+    but starting a process makes opening small files much slower, and the streams are not seekable.
+    """
+    _register_many(EXTERNAL_DECOMPRESSORS, first=True)
@@ -1,10 +1,27 @@
+import gzip
 import importlib.util
 import io
+import subprocess
+import sys
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
-from autoopen import find_handler, autoopen, OpenHandler, NoCompressorError
+import autoopen as autoopen_module
+from autoopen import (
+    find_handler,
+    autoopen,
+    autoopener,
+    autoopen_gz_rt,
+    autoopen_gz_rb,
+    autoopen_bz2_rb,
+    autoopen_xz_rb,
+    OpenHandler,
+    NoCompressorError,
+    SubprocessOpenHandler,
+)
 
 
 @pytest.fixture
@@ -12,6 +29,21 @@ def test_path() -> Path:
     return Path(__file__).resolve().parent
 
 
+@pytest.fixture
+def isolated_registry():
+    """Restores the handler registry after a test that registers handlers."""
+    registry = {
+        suffix: list(handlers) for suffix, handlers in autoopen_module._registry.items()
+    }
+    suffix_depth = autoopen_module._suffix_depth
+    yield
+    autoopen_module._registry.clear()
+    autoopen_module._registry.update(registry)
+    autoopen_module._suffix_depth = suffix_depth
+    autoopen_module._registry_version += 1
+    autoopen_module._freeze_registry()
+
+
 def test_find_handler():
     handler = find_handler("foo.txt.gz")
     assert handler.description == "GZip"
@@ -24,13 +56,17 @@ def test_read(test_path, suffix):
         assert text == "Hello World!\n"
 
 
-@pytest.mark.skipif(
+requires_zstandard = pytest.mark.skipif(
     importlib.util.find_spec("zstandard") is None, reason="requires zstandard from pypi"
 )
+
+
+@requires_zstandard
 def test_read_zstd(test_path):
     return test_read(test_path, ".zst")
 
 
+@pytest.mark.usefixtures("isolated_registry")
 def test_read_unavailable(test_path):
     OpenHandler(
         [".doesnotexist"], description="Not Existing format", module="doesnotexist"
@@ -54,3 +90,376 @@ def test_hyphen_write(monkeypatch):
     with autoopen("-", "wt") as f:
         f.write(s)
     assert fakeio.getvalue() == s
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys, autoopen\n"
+        "autoopen.autoopen('tests/hello.txt').close()\n"
+        "autoopen.find_handler('hello.txt.gz')\n"
+        "autoopen.find_handler('hello.txt.zst')\n"
+        "autoopen.EXTERNAL_DECOMPRESSORS[0].is_supported()\n"
+        "print(sorted({'gzip', 'bz2', 'lzma', 'zstandard', 'shutil', 'subprocess'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_is_supported_does_not_import(monkeypatch):
+    monkeypatch.delitem(sys.modules, "this", raising=False)
+    handler = OpenHandler([".this"], description="Zen", module="this")
+    assert handler.is_supported()
+    assert "this" not in sys.modules
+    assert handler._supported is True
+
+
+@pytest.mark.parametrize(
+    "filename, description",
+    [
+        ("foo.txt.gz", "GZip"),
+        ("FOO.TXT.GZ", "GZip"),
+        ("dir.gz/foo", "uncompressed files"),
+        ("dir/.gz", "uncompressed files"),
+        ("foo.gz.", "uncompressed files"),
+        (Path("foo.bz2"), "BZip2"),
+    ],
+)
+def test_find_handler_suffix(filename, description):
+    assert find_handler(filename).description == description
+
+
+@pytest.mark.parametrize(
+    "suffix",
+    [".gz", ".bz2", ".xz", ".lzma", pytest.param(".zst", marks=requires_zstandard), ""],
+)
+@pytest.mark.parametrize("buffer_size", [None, 16])
+def test_write_roundtrip(tmp_path, suffix, buffer_size):
+    path = tmp_path / ("hello.txt" + suffix)
+    with autoopen(path, "wt", encoding="utf-8", buffer_size=buffer_size) as f:
+        f.write("Hello World!\n" * 10)
+    with autoopen(path, "rb", buffer_size=buffer_size) as f:
+        assert f.read() == b"Hello World!\n" * 10
+
+
+@requires_zstandard
+def test_zstd_append(tmp_path):
+    path = tmp_path / "hello.txt.zst"
+    for mode in ("wt", "at"):
+        with autoopen(path, mode) as f:
+            f.write("Hello World!\n")
+    with autoopen(path, "rt") as f:
+        assert f.read() == "Hello World!\n" * 2
+
+
+@pytest.fixture
+def gzip_subprocess_handler():
+    handler = SubprocessOpenHandler(
+        [".gz"], description="GZip", command=["gzip", "-dc"]
+    )
+    if not handler.is_supported():
+        pytest.skip("requires gzip executable")
+    return handler
+
+
+def test_in_process_by_default():
+    assert not isinstance(find_handler("hello.txt.gz"), SubprocessOpenHandler)
+
+
+def test_subprocess_read(test_path, gzip_subprocess_handler):
+    with gzip_subprocess_handler(test_path / "hello.txt.gz", "rt") as f:
+        assert f.read() == "Hello World!\n"
+
+
+def test_subprocess_missing(tmp_path, gzip_subprocess_handler):
+    with pytest.raises(FileNotFoundError):
+        gzip_subprocess_handler(tmp_path / "missing.gz", "rb")
+
+
+def test_subprocess_corrupt(tmp_path, gzip_subprocess_handler):
+    path = tmp_path / "corrupt.gz"
+    path.write_bytes(b"This is no gzip file")
+    with pytest.raises(OSError, match="not in gzip format"):
+        with gzip_subprocess_handler(path, "rb") as f:
+            f.read()
+
+
+def test_subprocess_close_early(tmp_path, gzip_subprocess_handler):
+    path = tmp_path / "large.gz"
+    with autoopen(path, "wb") as f:
+        f.write(bytes(10_000_000))
+    with gzip_subprocess_handler(path, "rb") as f:
+        assert f.read(10) == bytes(10)
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_find_handler_multiple_suffixes():
+    OpenHandler([".nii.gz"], description="NIfTI", open_function=open).register()
+    assert find_handler("brain.nii.gz").description == "NIfTI"
+    assert find_handler("BRAIN.NII.GZ").description == "NIfTI"
+    assert find_handler("brain.gz").description == "GZip"
+    assert find_handler("dir.nii/brain.gz").description == "GZip"
+    assert find_handler(".nii.gz").description == "GZip"
+
+
+def test_find_handler_does_not_modify_registry():
+    suffixes = set(autoopen_module.open_handlers)
+    find_handler("foo.unknown")
+    find_handler("foo")
+    assert set(autoopen_module.open_handlers) == suffixes
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_supported_handlers_first():
+    unsupported = OpenHandler([".partition"], module="doesnotexist")
+    supported = OpenHandler([".partition"], open_function=open)
+    unsupported.register()
+    supported.register()
+    assert find_handler("foo.partition") is supported
+    assert autoopen_module.open_handlers[".partition"] == (supported, unsupported)
+
+
+def test_autoopener(test_path):
+    open_text = autoopener("rt", encoding="utf-8")
+    for suffix in [".gz", ".bz2", ".gz", "", ".xz", ""]:
+        with open_text(test_path / ("hello.txt" + suffix)) as f:
+            assert f.read() == "Hello World!\n"
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_autoopener_registration(tmp_path):
+    path = tmp_path / "hello.custom"
+    path.write_text("Hello World!\n")
+    open_text = autoopener("rt")
+    with open_text(path) as f:
+        assert f.read() == "Hello World!\n"
+    OpenHandler(
+        [".custom"], open_function=lambda file, **kwargs: io.StringIO("custom")
+    ).register()
+    with open_text(path) as f:
+        assert f.read() == "custom"
+
+
+def test_module_without_open(tmp_path):
+    handler = OpenHandler([".noopen"], description="No open", module="json")
+    with pytest.raises(NotImplementedError):
+        handler(tmp_path / "foo.noopen")
+    assert handler.open_function is None
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass slots need 3.10")
+def test_handler_slots():
+    assert not hasattr(OpenHandler([".slots"]), "__dict__")
+    assert not hasattr(SubprocessOpenHandler([".slots"], command=["cat"]), "__dict__")
+
+
+@pytest.mark.parametrize("module", ["doesnotexist", "doesnotexist.sub", "nspackage"])
+def test_is_supported_unavailable(tmp_path, monkeypatch, module):
+    (tmp_path / "nspackage").mkdir()
+    monkeypatch.syspath_prepend(str(tmp_path))
+    assert not OpenHandler([".unavailable"], module=module).is_supported()
+
+
+def test_buffered_writes(tmp_path):
+    class CountingWriter(io.BytesIO):
+        writes = 0
+
+        def write(self, data):
+            CountingWriter.writes += 1
+            return super().write(data)
+
+    handler = OpenHandler(
+        [".counting"],
+        open_function=lambda file, mode: CountingWriter(),
+        buffered=True,
+    )
+    with handler(tmp_path / "foo.counting", "wt", buffer_size=1 << 20) as f:
+        for _ in range(10_000):
+            f.write("Hello World!\n")
+    assert CountingWriter.writes == 1
+
+
+def test_hyphen_read_binary(monkeypatch):
+    s = b"Hello World!\n"
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(s)))
+    with autoopen("-", "rb") as f:
+        assert f.read() == s
+
+
+def test_read_binary_no_text_layer(test_path):
+    with autoopen(test_path / "hello.txt", "rb") as f:
+        assert isinstance(f, io.BufferedReader)
+    with autoopen(test_path / "hello.txt.bz2", "rb") as f:
+        assert not isinstance(f, io.TextIOBase)
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_open_handlers_read_only():
+    with pytest.raises(TypeError):
+        autoopen_module.open_handlers[".readonly"] = ()
+    handler = OpenHandler([".readonly"], open_function=open)
+    handler.register()
+    assert autoopen_module.open_handlers[".readonly"] == (handler,)
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_register_idempotent():
+    handler = OpenHandler([".twice"], open_function=open)
+    handler.register()
+    handler.register()
+    assert len(autoopen_module.open_handlers[".twice"]) == 1
+    equal = OpenHandler([".twice"], open_function=open)
+    equal.register(first=True)
+    assert [h is equal for h in autoopen_module.open_handlers[".twice"]] == [
+        True,
+        False,
+    ]
+    handler.register(first=True)
+    assert [h is handler for h in autoopen_module.open_handlers[".twice"]] == [
+        True,
+        False,
+    ]
+
+
+def test_autoopen_gz_rt(test_path):
+    with autoopen_gz_rt(test_path / "hello.txt.gz", encoding="utf-8") as f:
+        assert f.read() == "Hello World!\n"
+
+
+@pytest.mark.parametrize(
+    "function, suffix",
+    [(autoopen_gz_rb, ".gz"), (autoopen_bz2_rb, ".bz2"), (autoopen_xz_rb, ".xz")],
+)
+def test_autoopen_rb_shortcuts(test_path, function, suffix):
+    with function(test_path / ("hello.txt" + suffix)) as f:
+        assert f.read() == b"Hello World!\n"
+
+
+def test_stdout_stream(monkeypatch):
+    fakeio = io.StringIO()
+    monkeypatch.setattr("sys.stdout", fakeio)
+    with autoopen(sys.stdout, "wt") as f:
+        f.write("Hello World!\n")
+    assert fakeio.getvalue() == "Hello World!\n"
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_isolated_registry_restores_depth():
+    OpenHandler([".a.b.c"], open_function=open).register()
+    assert autoopen_module._suffix_depth == 3
+
+
+def test_suffix_depth_restored():
+    assert autoopen_module._suffix_depth == 1
+    assert ".a.b.c" not in autoopen_module.open_handlers
+
+
+def test_stdin_stream_write_mode(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO())
+    monkeypatch.setattr("sys.stdout", io.StringIO())
+    with pytest.raises(ValueError):
+        autoopen(sys.stdin, "wt")
+    with pytest.raises(ValueError):
+        autoopen(sys.stdout, "rt")
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_hyphen_registered_handler():
+    OpenHandler(
+        ["-"], open_function=lambda file, **kwargs: io.StringIO("custom")
+    ).register(first=True)
+    with autoopen("-") as f:
+        assert f.read() == "custom"
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_register_uppercase_suffix():
+    OpenHandler([".Z"], description="compress", open_function=open).register()
+    assert find_handler("foo.Z").description == "compress"
+    assert find_handler("foo.z").description == "compress"
+
+
+def test_autoopener_stdout_stream(monkeypatch):
+    monkeypatch.setattr("sys.stdout", io.StringIO())
+    with autoopener("wt")(sys.stdout) as f:
+        assert f is sys.stdout
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_partition_concurrently():
+    class SlowUnsupported(OpenHandler):
+        __slots__ = ()
+
+        def is_supported(self):
+            time.sleep(0.01)
+            return False
+
+    supported = OpenHandler([".race"], open_function=open)
+    supported.register()
+    SlowUnsupported([".race"]).register(first=True)
+    SlowUnsupported([".race"]).register(first=True)
+    results = []
+
+    def lookup():
+        results.append(find_handler("x.race"))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [supported] * 8
+    assert autoopen_module.open_handlers[".race"][0] is supported
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_partition_unchanged_keeps_snapshot():
+    OpenHandler([".none"], module="doesnotexist").register()
+    snapshot = autoopen_module.open_handlers
+    assert find_handler("x.none", checked=False) is None
+    assert autoopen_module.open_handlers is snapshot
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires sh")
+def test_subprocess_returns_available_data(tmp_path):
+    path = tmp_path / "hello.slow"
+    path.write_bytes(b"Hello World!\n")
+    handler = SubprocessOpenHandler([".slow"], command=["sh", "-c", "cat; sleep 5"])
+    start = time.monotonic()
+    with handler(path, "rb") as f:
+        assert f.read(5) == b"Hello"
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.usefixtures("isolated_registry")
+def test_use_external_decompressors(tmp_path, gzip_subprocess_handler):
+    autoopen_module.use_external_decompressors()
+    handler = find_handler("hello.txt.gz")
+    assert isinstance(handler, SubprocessOpenHandler)
+    path = tmp_path / "hello.txt.gz"
+    with autoopen(path, "wt") as f:
+        assert isinstance(f.buffer.raw, gzip.GzipFile)
+        f.write("Hello World!\n")
+    with autoopen(path, "rt") as f:
+        assert isinstance(f.buffer.raw, autoopen_module._ProcessReader)
+        assert f.read() == "Hello World!\n"
+
+
+def test_hyphen_reuses_context(monkeypatch):
+    monkeypatch.setattr("sys.stdout", io.StringIO())
+    assert autoopen("-", "wt") is autoopen("-", "wt")
+    with autoopen("-", "wt") as f:
+        assert f is sys.stdout
+    assert not sys.stdout.closed
+
+
+@pytest.mark.parametrize("file", ["-", "stdout"])
+def test_text_only_stdout_binary(monkeypatch, file):
+    monkeypatch.setattr("sys.stdout", io.StringIO())
+    with pytest.raises(ValueError):
+        autoopen(sys.stdout if file == "stdout" else file, "wb")